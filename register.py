@@ -1,72 +1,338 @@
+import glob
+import io
+import json
 import os
 import subprocess
 import time
 import re
 import struct
 import tarfile
+import threading
 import zipfile
-from typing import Optional
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from importlib.util import find_spec
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Iterator, Optional
 
 import jdk
 import requests
+from requests.adapters import HTTPAdapter
 from github import Github
-from tqdm import tqdm
 from jdk.enums import OperatingSystem
 
-from PIL import Image
 from colorama import init, Fore, Style
 
-try:
-    from pyzbar.pyzbar import decode
-except:
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+# tqdm, PIL and pyzbar are imported where they are used; only check that they are installed
+if find_spec("tqdm") is None or find_spec("PIL") is None or find_spec("pyzbar") is None:
     print("Please install the required dependencies by running 'pip install -r requirements.txt'")
-    print("IF YOU STILL ENCOUNTER ISSUES, PLEASE INSTALL THE FOLLOWING:")
-    print("https://www.microsoft.com/en-gb/download/details.aspx?id=40784")
     exit(1)
 
 # Initialize colorama for cross-platform colored output
 init()
 
+# Read/write granularity for large downloads and archive extraction
+CHUNK_SIZE = 1024 * 1024
+
+# Class file major version per JAR path, reused across repeated Java checks
+_class_version_cache: dict = {}
+
 class Logger:
     @staticmethod
     def log(message: str, color: str = Fore.WHITE) -> None:
         print(f"{color}[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}{Style.RESET_ALL}")
 
+class DownloadUtils:
+    # More concurrent range requests tend to get throttled or rejected by release CDNs
+    MAX_STREAMS = 5
+
+    @staticmethod
+    def progress_bar(desc: str, total_size: int) -> "tqdm":
+        from tqdm import tqdm
+
+        return tqdm(
+            desc=desc,
+            total=total_size,
+            unit='B',
+            unit_scale=True,
+            unit_divisor=1024,
+        )
+
+    @staticmethod
+    def preallocate(f: io.IOBase, total_size: int) -> None:
+        # Reserving the full size up front avoids growing the file with every written chunk
+        try:
+            os.posix_fallocate(f.fileno(), 0, total_size)
+        except (AttributeError, OSError):
+            # posix_fallocate is missing on Windows and macOS, so set the final size directly instead
+            f.truncate(total_size)
+            f.seek(0)
+
+    @staticmethod
+    @contextmanager
+    def remove_on_failure(download_path: str) -> Iterator[None]:
+        # A preallocated file would otherwise look like a finished download on the next run,
+        # so also clean up when the download is interrupted with Ctrl-C
+        try:
+            yield
+        except BaseException:
+            if os.path.exists(download_path):
+                os.remove(download_path)
+            raise
+
+    @staticmethod
+    def download_stream(session: requests.Session, url: str, download_path: str, desc: str) -> None:
+        response = session.get(url, stream=True)
+        response.raise_for_status()
+        total_size = int(response.headers.get('content-length', 0))
+
+        with DownloadUtils.remove_on_failure(download_path), \
+                io.BufferedWriter(io.FileIO(download_path, 'wb'), buffer_size=CHUNK_SIZE) as f, \
+                DownloadUtils.progress_bar(desc, total_size) as bar:
+            # Content-Length is the encoded size, so it only predicts the file size without Content-Encoding
+            if total_size > 0 and 'content-encoding' not in response.headers:
+                DownloadUtils.preallocate(f, total_size)
+            # iter_content turns dropped connections and timeouts into requests exceptions
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                bar.update(len(chunk))
+            f.truncate()
+
+    @staticmethod
+    def download_range(session: requests.Session, url: str, download_path: str, start: int, end: int,
+                       bar: "tqdm", stop: threading.Event) -> None:
+        with session.get(url, headers={'Range': f'bytes={start}-{end - 1}'}, stream=True) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise requests.HTTPError(f"Range request ignored by server: {response.status_code}",
+                                         response=response)
+
+            # Each worker writes its own slice through a separate handle, which also works on Windows (no os.pwrite)
+            written = 0
+            with open(download_path, 'r+b', buffering=CHUNK_SIZE) as f:
+                f.seek(start)
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if stop.is_set():
+                        return
+                    f.write(chunk)
+                    written += len(chunk)
+                    bar.update(len(chunk))
+
+        # A short range would leave a zero-filled gap in the preallocated file
+        if written != end - start:
+            raise requests.ConnectionError(f"Range {start}-{end - 1} returned {written} of {end - start} bytes")
+
+    @staticmethod
+    def download_ranges(session: requests.Session, url: str, download_path: str, desc: str, total_size: int,
+                        streams: int) -> None:
+        part_size = -(-total_size // streams)
+        ranges = [(start, min(start + part_size, total_size)) for start in range(0, total_size, part_size)]
+
+        with open(download_path, 'wb') as f:
+            DownloadUtils.preallocate(f, total_size)
+
+        # Stop the remaining workers as soon as one range fails or the user interrupts
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(ranges))
+        try:
+            with DownloadUtils.progress_bar(desc, total_size) as bar:
+                futures = [executor.submit(DownloadUtils.download_range, session, url, download_path, start, end,
+                                           bar, stop)
+                           for start, end in ranges]
+                for future in as_completed(futures):
+                    future.result()
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def download_parallel(session: requests.Session, url: str, download_path: str, desc: str,
+                          streams: int = MAX_STREAMS) -> None:
+        try:
+            head = session.head(url, allow_redirects=True)
+            head.raise_for_status()
+        except requests.RequestException:
+            # Some servers reject HEAD, so treat that like missing range support
+            head = None
+        total_size = int(head.headers.get('content-length', 0)) if head is not None else 0
+        streams = min(streams, DownloadUtils.MAX_STREAMS)
+
+        # Small files or servers without range support are not worth splitting
+        if head is None or head.headers.get('accept-ranges') != 'bytes' or total_size < streams * CHUNK_SIZE:
+            DownloadUtils.download_stream(session, url, download_path, desc)
+            return
+
+        try:
+            # Request the resolved URL so every range skips the redirect chain
+            with DownloadUtils.remove_on_failure(download_path):
+                DownloadUtils.download_ranges(session, head.url, download_path, desc, total_size, streams)
+            return
+        except requests.RequestException as e:
+            # Servers may advertise ranges and still refuse them, so retry the plain way
+            Logger.log(f"Parallel download of {desc} failed ({e}), retrying with a single stream", Fore.YELLOW)
+
+        DownloadUtils.download_stream(session, url, download_path, desc)
+
+
 class GithubUtils:
-    def __init__(self):
+    # Cached release lookups are reused without asking GitHub for this many seconds
+    CACHE_TTL = 6 * 60 * 60
+
+    def __init__(self, cache_dir: Optional[str] = None):
         self.github = Github()
+        # Shared by the release check and all downloads so TLS connections are reused
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.cache_dir = cache_dir
 
     def get_latest_release(self, repo_name: str) -> Optional[object]:
+        cache_path = self.get_cache_path(repo_name)
+        cached = self.load_cached_release(cache_path)
+        if cached is not None:
+            if time.time() - os.path.getmtime(cache_path) < self.CACHE_TTL:
+                return SimpleNamespace(**cached["asset"])
+            asset = self.revalidate_release(repo_name, cache_path, cached)
+            if asset is not None:
+                return asset
+
         repo = self.github.get_repo(repo_name)
         latest_release = repo.get_latest_release()
         for asset in latest_release.get_assets():
-            if asset.name.endswith(".tar.gz") and "linux" not in asset.name.lower():
+            if self.is_wanted_asset(asset.name):
+                self.save_cached_release(cache_path, latest_release.etag, asset)
                 return asset
         return None
 
     @staticmethod
-    def download_asset(asset: object, download_path: str) -> Optional[str]:
-        download_url = asset.browser_download_url
-        response = requests.get(download_url, stream=True)
-        total_size = int(response.headers.get('content-length', 0))
+    def is_wanted_asset(name: str) -> bool:
+        return name.endswith(".tar.gz") and "linux" not in name.lower()
 
-        if response.status_code == 200:
-            with open(download_path, 'wb') as f, tqdm(
-                    desc=asset.name,
-                    total=total_size,
-                    unit='B',
-                    unit_scale=True,
-                    unit_divisor=1024,
-            ) as bar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                    bar.update(len(chunk))
+    def get_cache_path(self, repo_name: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f".gh_cache_{repo_name.replace('/', '_')}.json")
+
+    @staticmethod
+    def load_cached_release(cache_path: Optional[str]) -> Optional[dict]:
+        if cache_path is None or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Ignore cache files that parse but do not have the expected shape
+        if not isinstance(cached, dict) or not isinstance(cached.get("asset"), dict):
+            return None
+        asset = cached["asset"]
+        if not isinstance(asset.get("name"), str) or not isinstance(asset.get("browser_download_url"), str):
+            return None
+        return cached
+
+    @staticmethod
+    def save_cached_release(cache_path: Optional[str], etag: Optional[str], asset: object) -> None:
+        if cache_path is None:
+            return
+        cached = {
+            "etag": etag,
+            "asset": {
+                "name": asset.name,
+                "browser_download_url": asset.browser_download_url,
+                "size": asset.size,
+            },
+        }
+        try:
+            with open(cache_path, 'w') as f:
+                json.dump(cached, f)
+        except OSError as e:
+            Logger.log(f"Could not cache release info: {e}")
+
+    def revalidate_release(self, repo_name: str, cache_path: str, cached: dict) -> Optional[object]:
+        # One conditional request either confirms the cache (304) or already carries the new release (200),
+        # instead of the three PyGithub needs to look the release up again
+        headers = {'If-None-Match': cached["etag"]} if cached.get("etag") else {}
+        try:
+            response = self.session.get(f"https://api.github.com/repos/{repo_name}/releases/latest", headers=headers)
+            if response.status_code not in (200, 304):
+                return None
+            release = response.json() if response.status_code == 200 else None
+        except (requests.RequestException, ValueError):
+            return None
+
+        if response.status_code == 304:
+            # Restart the TTL so the next runs skip the network again
+            try:
+                os.utime(cache_path)
+            except OSError:
+                pass
+            return SimpleNamespace(**cached["asset"])
+
+        assets = release.get("assets") if isinstance(release, dict) else None
+        for asset in assets or []:
+            if not isinstance(asset, dict) or not isinstance(asset.get("browser_download_url"), str):
+                continue
+            if self.is_wanted_asset(str(asset.get("name", ""))):
+                asset = SimpleNamespace(
+                    name=asset["name"],
+                    browser_download_url=asset["browser_download_url"],
+                    size=asset.get("size"),
+                )
+                self.save_cached_release(cache_path, response.headers.get("ETag"), asset)
+                return asset
+        return None
+
+    def download_asset(self, asset: object, download_path: str) -> Optional[str]:
+        try:
+            DownloadUtils.download_parallel(self.session, asset.browser_download_url, download_path, asset.name)
             return download_path
-        else:
-            Logger.log(f"Failed to download {asset.name}: {response.status_code}", Fore.RED)
+        except requests.RequestException as e:
+            Logger.log(f"Failed to download {asset.name}: {e}", Fore.RED)
             return None
 
 
+class GzipReader(io.RawIOBase):
+    """Raw stream that gunzips a file with zlib in CHUNK_SIZE batches."""
+
+    def __init__(self, file_path: str):
+        self.file = open(file_path, 'rb', buffering=0)
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self.decompressor.eof:
+                # Like gzip.GzipFile, continue with the next member and ignore trailing zero padding
+                self.pending = self.decompressor.unused_data.lstrip(b"\x00")
+                while not self.pending:
+                    self.pending = self.file.read(CHUNK_SIZE)
+                    if not self.pending:
+                        return 0
+                    self.pending = self.pending.lstrip(b"\x00")
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if not self.pending:
+                self.pending = self.file.read(CHUNK_SIZE)
+                if not self.pending:
+                    raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            data = self.decompressor.decompress(self.pending, len(buffer))
+            self.pending = self.decompressor.unconsumed_tail
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+
+    def close(self) -> None:
+        self.file.close()
+        super().close()
+
+
 class FileUtils:
     @staticmethod
     def get_name_without_extension(filepath: str) -> str:
@@ -80,8 +346,16 @@ class FileUtils:
         if folder_name:
             extract_to = os.path.join(extract_to, folder_name)
         os.makedirs(extract_to, exist_ok=True)
-        with tarfile.open(file_path, "r:gz") as tar:
-            tar.extractall(path=extract_to)
+        # Gunzip in large batches behind a buffered reader and read the tar in stream mode, front to back.
+        # tarfile keeps its default record size since it re-slices its buffer on every header read.
+        with io.BufferedReader(GzipReader(file_path), buffer_size=CHUNK_SIZE) as gz, \
+                tarfile.open(fileobj=gz, mode="r|", copybufsize=CHUNK_SIZE) as tar:
+            # Extract members as they are read; skipping chmod/utime saves syscalls per file
+            extract_kwargs = {'set_attrs': False}
+            if hasattr(tarfile, 'data_filter'):
+                extract_kwargs['filter'] = 'data'
+            for member in tar:
+                tar.extract(member, path=extract_to, **extract_kwargs)
         Logger.log(f"Extraction complete to {extract_to}")
 
     @staticmethod
@@ -103,11 +377,46 @@ class FileUtils:
                 return
 
             os.makedirs(extract_to, exist_ok=True)
-            zip_ref.extractall(extract_to)
-            Logger.log(f"Extraction complete to {extract_to}")
+
+            # Directory entries are cheap, so create them serially with ZipFile's own path cleaning
+            members = zip_ref.infolist()
+            for member in members:
+                if member.is_dir():
+                    zip_ref.extract(member, extract_to)
+
+        # zlib releases the GIL while inflating, so members decompress in parallel. ZipFile is not
+        # thread-safe, so every worker opens the archive itself and extracts its own share of members.
+        files = [member for member in members if not member.is_dir()]
+        workers = max(1, min(os.cpu_count() or 1, len(files)))
+
+        def extract_members(batch: list) -> None:
+            with zipfile.ZipFile(file_path, 'r') as worker_zip:
+                for member in batch:
+                    try:
+                        worker_zip.extract(member, extract_to)
+                    except FileExistsError:
+                        # Another worker created the same parent directory between exists() and makedirs()
+                        worker_zip.extract(member, extract_to)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(extract_members, [files[i::workers] for i in range(workers)]))
+        Logger.log(f"Extraction complete to {extract_to}")
 
     @staticmethod
     def find_cli_jar(dir: str) -> Optional[str]:
+        # signal-cli releases ship the jar at <release>/lib/signal-cli-*.jar, so check there first
+        with os.scandir(dir) as tops:
+            for top in tops:
+                if not top.is_dir():
+                    continue
+                lib_dir = os.path.join(top.path, "lib")
+                if not os.path.isdir(lib_dir):
+                    continue
+                with os.scandir(lib_dir) as entries:
+                    for entry in entries:
+                        if entry.name.startswith("signal-cli") and entry.name.endswith(".jar") and entry.is_file():
+                            return entry.path
+
         for root, _, files in os.walk(dir):
             for file in files:
                 if file.endswith(".jar") and os.path.basename(file).startswith("signal-cli"):
@@ -116,40 +425,55 @@ class FileUtils:
 
 
 class JavaUtils:
+    @staticmethod
+    def read_build_java(jar_path: str) -> Optional[int]:
+        try:
+            with zipfile.ZipFile(jar_path, 'r') as jar:
+                manifest = jar.read('META-INF/MANIFEST.MF').decode('utf-8', 'replace')
+        except (KeyError, OSError, zipfile.BadZipFile):
+            return None
+
+        match = re.search(r'^Build-Jdk-Spec:\s*(\d+)', manifest, re.MULTILINE)
+        if match is None:
+            # Build-Jdk holds a full version such as "17.0.2" or the legacy "1.8.0_292"
+            match = re.search(r'^Build-Jdk:\s*(?:1\.)?(\d+)', manifest, re.MULTILINE)
+        return int(match.group(1)) if match else None
+
     @staticmethod
     def get_java_version_of_file(jar_path: str) -> Optional[int]:
+        if jar_path in _class_version_cache:
+            return _class_version_cache[jar_path]
+
         try:
             with zipfile.ZipFile(jar_path, 'r') as jar:
-                for file_name in jar.namelist():
-                    if file_name.endswith('.class'):
-                        with jar.open(file_name) as class_file:
-                            header = class_file.read(8)
-                            if len(header) < 8:
-                                continue
-                            magic, _, major_version = struct.unpack('>IHH', header)
-                            if magic != 0xCAFEBABE:
-                                continue
-                            return major_version
+                for info in jar.infolist():
+                    if not info.filename.endswith('.class') or info.file_size < 8:
+                        continue
+                    # Only the header is needed, so stop decompressing after 8 bytes
+                    with jar.open(info, 'r') as class_file:
+                        header = class_file.read(8)
+                    if len(header) < 8:
+                        continue
+                    magic, _, major_version = struct.unpack('>IHH', header)
+                    if magic != 0xCAFEBABE:
+                        continue
+                    _class_version_cache[jar_path] = major_version
+                    return major_version
         except Exception as e:
             Logger.log(f"Error reading JAR file: {e}")
             return None
 
     @staticmethod
     def java_version_from_major(major_version: int) -> str:
-        version_mapping = {
-            45: "Java 1.1", 46: "Java 1.2", 47: "Java 1.3", 48: "Java 1.4",
-            49: "Java 5", 50: "Java 6", 51: "Java 7", 52: "Java 8",
-            53: "Java 9", 54: "Java 10", 55: "Java 11", 56: "Java 12",
-            57: "Java 13", 58: "Java 14", 59: "Java 15", 60: "Java 16",
-            61: "Java 17", 62: "Java 18", 63: "Java 19", 64: "Java 20",
-            65: "Java 21", 66: "Java 22", 67: "Java 23", 68: "Java 24",
-            69: "Java 25", 70: "Java 26", 71: "Java 27", 72: "Java 28",
-            73: "Java 29", 74: "Java 30",
-        }
-        return version_mapping.get(major_version, "Unknown Java version")
+        # Class file major versions start at 45 for Java 1.1; from Java 5 (49) on they are release + 44
+        if major_version < 45:
+            return "Unknown Java version"
+        if major_version <= 48:
+            return f"Java 1.{major_version - 44}"
+        return f"Java {major_version - 44}"
 
     @staticmethod
-    def download_openjdk(version: str, download_path: str) -> Optional[str]:
+    def download_openjdk(version: str, download_path: str, session: requests.Session) -> Optional[str]:
         version = re.sub(r'\D', '', version)
         download_url = jdk.get_download_url(str(version), vendor="Corretto", operating_system=OperatingSystem.WINDOWS)
 
@@ -163,33 +487,21 @@ class JavaUtils:
             Logger.log(f"OpenJDK {version} already downloaded")
             return download_path
 
-        response = requests.get(download_url, stream=True)
-        total_size = int(response.headers.get('content-length', 0))
-
-        if response.status_code == 200:
-            with open(download_path, 'wb') as f, tqdm(
-                    desc=f"OpenJDK {version}",
-                    total=total_size,
-                    unit='B',
-                    unit_scale=True,
-                    unit_divisor=1024,
-            ) as bar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                    bar.update(len(chunk))
+        try:
+            DownloadUtils.download_parallel(session, download_url, download_path, f"OpenJDK {version}")
             Logger.log(f"Downloaded OpenJDK {version} successfully")
             return download_path
-        else:
-            Logger.log(f"Failed to download OpenJDK {version}: {response.status_code}")
+        except requests.RequestException as e:
+            Logger.log(f"Failed to download OpenJDK {version}: {e}")
             return None
 
 
 class SignalCLISetup:
     def __init__(self, dependencies_directory: str):
         self.dependencies_directory = dependencies_directory
-        self.github_utils = GithubUtils()
         self.current_dir = os.path.dirname(os.path.realpath(__file__))
         self.dep_dir = os.path.join(self.current_dir, self.dependencies_directory)
+        self.github_utils = GithubUtils(self.dep_dir)
         self.signal_cli_dir = os.path.join(self.dep_dir, "signal-cli")
 
     def setup(self) -> str:
@@ -253,25 +565,19 @@ class SignalCLISetup:
             print(f"Error: The file '{batch_file_path}' does not exist.")
             return
 
-        # Read the batch file content
-        with open(batch_file_path, 'r') as file:
-            lines = file.readlines()
-
-        # Define the line to replace
-        original_line = 'set JAVA_EXE=%JAVA_HOME%/bin/java.exe\n'
-        modified_line = f'set JAVA_EXE={custom_java_exe}\n'
+        # Keep the file's own line endings by disabling newline translation
+        with open(batch_file_path, 'r', newline='') as file:
+            content = file.read()
 
-        # Flag to track if the replacement was successful
-        replaced = False
+        # Replace the line that points at the system Java
+        original_line = 'set JAVA_EXE=%JAVA_HOME%/bin/java.exe'
+        modified_line = f'set JAVA_EXE={custom_java_exe}'
+        modified_content = content.replace(original_line, modified_line, 1)
 
-        # Modify the batch file content
-        with open(batch_file_path, 'w') as file:
-            for line in lines:
-                if line == original_line:
-                    file.write(modified_line)
-                    replaced = True
-                else:
-                    file.write(line)
+        replaced = modified_content != content
+        if replaced:
+            with open(batch_file_path, 'w', newline='') as file:
+                file.write(modified_content)
 
         # Print the result of the modification
         if replaced:
@@ -280,45 +586,62 @@ class SignalCLISetup:
             Logger.log(f"Line not found. No changes made to '{batch_file_path}'.")
 
     def check_and_setup_java(self) -> Optional[str]:
+        # An already extracted JDK is reused as-is, just like extract_zip skips an existing openjdk folder
+        existing = glob.glob(os.path.join(self.dep_dir, "openjdk", "*", "bin", "java.exe"))
+        if existing:
+            Logger.log(f"Reusing Java at {existing[0]}", Fore.CYAN)
+            return existing[0]
+
         Logger.log("Checking for correct java version")
         java_file = FileUtils.find_cli_jar(self.signal_cli_dir)
         if java_file is None:
             Logger.log("Failed to find signal-cli jar")
             return None
 
-        major_version = JavaUtils.get_java_version_of_file(java_file)
-        if major_version is not None:
+        # The manifest names the JDK the jar was built with, which can be a release Corretto no longer offers,
+        # so fall back to the version the class files target if that download fails
+        download_path = None
+        build_version = JavaUtils.read_build_java(java_file)
+        build_java_version = f"Java {build_version}" if build_version is not None else None
+        if build_java_version is not None:
+            Logger.log(f"Java Version the JAR was built with: {build_java_version}")
+            Logger.log("Downloading OpenJDK")
+            download_path = JavaUtils.download_openjdk(build_java_version, self.dep_dir, self.github_utils.session)
+
+        if not download_path:
+            major_version = JavaUtils.get_java_version_of_file(java_file)
+            if major_version is None:
+                Logger.log("Could not determine the Java version from the JAR file.")
+                return None
+
             java_version = JavaUtils.java_version_from_major(major_version)
             Logger.log(f"Java Version of File: {java_version}")
-
-            Logger.log("Downloading OpenJDK")
-            download_path = JavaUtils.download_openjdk(java_version, self.dep_dir)
+            if java_version != build_java_version:
+                Logger.log("Downloading OpenJDK")
+                download_path = JavaUtils.download_openjdk(java_version, self.dep_dir, self.github_utils.session)
             if not download_path:
                 Logger.log("Failed to download OpenJDK")
                 return None
 
-            Logger.log("Extracting OpenJDK")
-            # Check if the OpenJDK has already been extracted
+        Logger.log("Extracting OpenJDK")
+        # Check if the OpenJDK has already been extracted
 
-            FileUtils.extract_zip(download_path, self.dep_dir, "openjdk")
+        FileUtils.extract_zip(download_path, self.dep_dir, "openjdk")
 
-            # Find the first directory in the extracted OpenJDK
-            openjdk_dir = os.path.join(self.dep_dir, "openjdk")
-            for root, dirs, _ in os.walk(openjdk_dir):
-                if dirs:
-                    openjdk_dir = os.path.join(root, dirs[0])
-                    break
+        # Find the first directory in the extracted OpenJDK
+        openjdk_dir = os.path.join(self.dep_dir, "openjdk")
+        for root, dirs, _ in os.walk(openjdk_dir):
+            if dirs:
+                openjdk_dir = os.path.join(root, dirs[0])
+                break
 
-            Logger.log(f"Extracted OpenJDK")
-            java_path = os.path.join(openjdk_dir, "bin", "java.exe")
-            if os.path.exists(java_path):
-                Logger.log(f"Java path: {java_path}")
-                return java_path
-            else:
-                Logger.log(f"Java executable not found at expected path: {java_path}")
-                return None
+        Logger.log(f"Extracted OpenJDK")
+        java_path = os.path.join(openjdk_dir, "bin", "java.exe")
+        if os.path.exists(java_path):
+            Logger.log(f"Java path: {java_path}")
+            return java_path
         else:
-            Logger.log("Could not determine the Java version from the JAR file.")
+            Logger.log(f"Java executable not found at expected path: {java_path}")
             return None
 
 
@@ -327,10 +650,27 @@ class SignalCLIInteraction:
         self.signal_cli_path = signal_cli_path
         self.phone_number = phone_number
 
+    def run_signal_cli(self, *args: str) -> subprocess.CompletedProcess:
+        argv = [self.signal_cli_path, "-u", self.phone_number, *args]
+        if os.name == "nt":
+            # signal-cli.bat is run by cmd.exe, which treats & | < > ^ outside quotes as operators.
+            # list2cmdline only quotes arguments with spaces, so quote every argument explicitly.
+            if any('"' in arg for arg in argv):
+                Logger.log("Arguments for signal-cli must not contain double quotes", Fore.RED)
+                exit(1)
+            command = " ".join(f'"{arg}"' for arg in argv)
+        else:
+            command = argv
+        return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
     def register(self, captcha: str) -> None:
+        # Captcha tokens are URL-safe; anything else would only reach cmd.exe as extra syntax
+        if not re.fullmatch(r'[A-Za-z0-9:/._\-+=]+', captcha):
+            Logger.log("Invalid captcha", Fore.RED)
+            exit(1)
+
         Logger.log("Registering Phone Number", Fore.YELLOW)
-        command = f"{self.signal_cli_path} -u {self.phone_number} register --captcha {captcha}"
-        result = subprocess.run(command, capture_output=True, text=True)
+        result = self.run_signal_cli("register", "--captcha", captcha)
         error = result.stderr.strip()
 
         if "Failed to register" in error:
@@ -346,8 +686,7 @@ class SignalCLIInteraction:
             exit(1)
 
         Logger.log("Verifying code", Fore.YELLOW)
-        command = f"{self.signal_cli_path} -u {self.phone_number} verify {code}"
-        result = subprocess.run(command, capture_output=True, text=True)
+        result = self.run_signal_cli("verify", code)
         error = result.stderr.strip()
 
         if "Verify error" in error:
@@ -362,15 +701,31 @@ class SignalCLIInteraction:
             Logger.log("Invalid path", Fore.RED)
             exit(1)
 
-        img = Image.open(screenshot)
-        result = decode(img)[0].data.decode()
+        try:
+            from PIL import Image
+            from pyzbar.pyzbar import decode, ZBarSymbol
+        except (ImportError, OSError):
+            print("Please install the required dependencies by running 'pip install -r requirements.txt'")
+            print("IF YOU STILL ENCOUNTER ISSUES, PLEASE INSTALL THE FOLLOWING:")
+            print("https://www.microsoft.com/en-gb/download/details.aspx?id=40784")
+            exit(1)
+
+        # Grayscale and only QR symbols keep the scan cheap on large screenshots
+        img = Image.open(screenshot).convert('L')
+        small = img.copy()
+        small.thumbnail((1024, 1024), Image.BILINEAR)
+        codes = decode(small, symbols=[ZBarSymbol.QRCODE])
+        if not codes and small.size != img.size:
+            # Tiny QR codes can become unreadable when downscaled, so retry at full resolution
+            codes = decode(img, symbols=[ZBarSymbol.QRCODE])
+
+        result = codes[0].data.decode() if codes else None
         if not result:
             Logger.log("Failed to decode QR Code", Fore.RED)
             exit(1)
 
         Logger.log("Adding Device", Fore.YELLOW)
-        command = f"""{self.signal_cli_path} -u {self.phone_number} addDevice --uri "{result}" """
-        result = subprocess.run(command, capture_output=True, text=True)
+        result = self.run_signal_cli("addDevice", "--uri", result)
         error = result.stderr.strip()
 
         if "invalid format" in error or "failed" in error:
@@ -386,8 +741,7 @@ class SignalCLIInteraction:
             exit(1)
         
         Logger.log("Adding PIN", Fore.YELLOW)
-        command = f"{self.signal_cli_path} -u {self.phone_number} setPin {pin}"
-        result = subprocess.run(command, capture_output=True, text=True)
+        result = self.run_signal_cli("setPin", pin)
         error = result.stderr.strip()
         if("failed" in error or "error" in error):
             Logger.log("Failed to add PIN", Fore.RED)
@@ -397,6 +751,15 @@ class SignalCLIInteraction:
 
 
 if __name__ == "__main__":
+    # find_spec cannot tell whether the zbar DLL loads, so import pyzbar before anything changes the account
+    try:
+        import pyzbar.pyzbar
+    except (ImportError, OSError):
+        print("Please install the required dependencies by running 'pip install -r requirements.txt'")
+        print("IF YOU STILL ENCOUNTER ISSUES, PLEASE INSTALL THE FOLLOWING:")
+        print("https://www.microsoft.com/en-gb/download/details.aspx?id=40784")
+        exit(1)
+
     setup = SignalCLISetup("assets")
     batch_path = setup.setup()
 